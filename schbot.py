@@ -5,7 +5,11 @@ Tweet a trending topic using shm-reduplication.
 """
 from __future__ import print_function, unicode_literals
 import argparse
+import json
 import random
+import re
+import schhistory
+import schindex
 import schpy
 import sys
 import twitter
@@ -26,6 +30,134 @@ WOE_IDS = {
 }
 
 TWITTER = None
+# Gives response bodies as text, for decode_trends
+TWITTER_RAW = None
+
+try:
+    from sys import intern
+except ImportError:  # Python 2 can't intern unicode, so don't
+    def intern(string):
+        return string
+
+
+class Trend(object):
+    """
+    A trending topic, without the rest of the API's dict.
+    Names are interned so repeats across locations and fetches share memory.
+    """
+    __slots__ = ('name', 'promoted', 'tweet_volume', 'location')
+
+    def __init__(self, name, promoted=False, tweet_volume=None,
+                 location=None):
+        self.name = intern(name)
+        self.promoted = promoted
+        self.tweet_volume = tweet_volume
+        self.location = location
+
+    @classmethod
+    def from_dict(cls, trend, location=None):
+        return cls(trend['name'], bool(trend.get('promoted_content')),
+                   trend.get('tweet_volume'), location)
+
+    def __eq__(self, other):
+        return (isinstance(other, Trend) and
+                all(getattr(self, slot) == getattr(other, slot)
+                    for slot in self.__slots__))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Trend({0!r}, promoted={1!r}, tweet_volume={2!r}, " \
+            "location={3!r})".format(self.name, self.promoted,
+                                     self.tweet_volume, self.location)
+
+
+try:
+    STRING_TYPES = basestring
+except NameError:  # Python 3
+    STRING_TYPES = str
+
+WHITESPACE = re.compile(r'\s*')
+
+
+def _expect(raw, pos, chars):
+    """
+    Skip whitespace, then check the next char is one of chars.
+    @return that char and the position after it (tuple)
+    """
+    pos = WHITESPACE.match(raw, pos).end()
+    if pos >= len(raw) or raw[pos] not in chars:
+        raise ValueError("Expecting one of {0!r} at {1} in trends "
+                         "response".format(chars, pos))
+    return raw[pos], pos + 1
+
+
+def decode_trends(raw, location=None):
+    """
+    Yield a Trend for each item of the "trends" array in a raw
+    trends/place JSON response, decoding one item at a time rather than
+    the whole response.
+    Raises ValueError if raw isn't a well-formed response.
+    """
+    decoder = json.JSONDecoder()
+    char, pos = _expect(raw, 0, "[")
+    char, pos = _expect(raw, pos, "{")
+
+    # Find the top-level "trends" key, skipping any others before it
+    while True:
+        char, pos = _expect(raw, pos, '"}')
+        if char == "}":
+            raise ValueError("No trends in trends response")
+        key, pos = decoder.raw_decode(raw, pos - 1)
+        char, pos = _expect(raw, pos, ":")
+        if key == "trends":
+            break
+        _, pos = decoder.raw_decode(
+            raw, WHITESPACE.match(raw, pos).end())
+        char, pos = _expect(raw, pos, ",}")
+        if char == "}":
+            raise ValueError("No trends in trends response")
+
+    char, pos = _expect(raw, pos, "[")
+    if _expect(raw, pos, "]{")[0] == "]":
+        return
+    while True:
+        trend, pos = decoder.raw_decode(raw, WHITESPACE.match(raw, pos).end())
+        yield Trend.from_dict(trend, location)
+        char, pos = _expect(raw, pos, ",]")
+        if char == "]":
+            return
+
+
+def iter_trends(response, location=None):
+    """
+    Yield a Trend for each trending topic in a trends/place response,
+    either raw JSON text or as already decoded by the twitter module.
+    """
+    if isinstance(response, STRING_TYPES):
+        return decode_trends(response, location)
+    return (Trend.from_dict(trend, location)
+            for trend in response[0]['trends'])
+
+
+def fetch_raw_trends(woe_id):
+    """
+    @return trends/place response body, undecoded (string)
+    """
+    global TWITTER_RAW
+
+    # With format="" the twitter module doesn't decode the response, but
+    # doesn't add ".json" to the URL either, so ask for that by name
+    if TWITTER_RAW is None:
+        TWITTER_RAW = twitter.Twitter(auth=twitter.OAuth(
+            data['access_token'],
+            data['access_token_secret'],
+            data['consumer_key'],
+            data['consumer_secret']), format="")
+    return getattr(TWITTER_RAW.trends, "place.json")(_id=woe_id)
 
 
 # cmd.exe cannot do Unicode so encode first
@@ -77,55 +209,32 @@ def load_list(the_filename):
     return my_list
 
 
-def case_insensitive_in(a, b):
-    """
-    Like in(), but case-insensitive.
-    case_insensitive_in("x", ["x", "y"]) == True
-    case_insensitive_in("X", ["X", "Y"]) == True
-    case_insensitive_in("X", ["x", "y"]) == True
-    case_insensitive_in("x", ["X", "Y"]) == True
-    """
-    a_lower = a.lower()
-    return any(a_lower == val.lower() for val in b)
-
-
 def get_trending_topics_from_twitter(location="World"):
-    global TWITTER
-
     print("Location:", location)
 
     # Create and authorise an app with (read and) write access at:
     # https://dev.twitter.com/apps/new
     # Store credentials in YAML file
-    if TWITTER is None:
-        TWITTER = twitter.Twitter(auth=twitter.OAuth(
-            data['access_token'],
-            data['access_token_secret'],
-            data['consumer_key'],
-            data['consumer_secret']))
 
     # Returns the locations that Twitter has trending topic information for.
 #     world_locations = TWITTER.trends.available()
 #     pprint(world_locations)
 #     print("*"*80)
 
-    trends = TWITTER.trends.place(_id=WOE_IDS[location])[0]
-    pprint(trends)
-    print(type(trends))
+    response = fetch_raw_trends(WOE_IDS[location])
+    print(len(response), "bytes")
 
     kept_trends = []
-    for trend in trends['trends']:
+    for trend in iter_trends(response, location):
         print("-"*80)
         pprint(trend)
-        promoted_content = trend['promoted_content']
-        trend = trend['name']
-        print(trend)
-        print("Already posted?", trend in saved_trends)
+        already_posted = trend.name in saved_trends
+        print("Already posted?", already_posted)
 
-        if (not trend.lower().endswith("day") and
-            not promoted_content and
-            not case_insensitive_in(trend, saved_trends)):
-            kept_trends.append(trend)
+        if (not trend.name.lower().endswith("day") and
+            not trend.promoted and
+            not already_posted):
+            kept_trends.append(trend.name)
 
     return kept_trends
 
@@ -164,6 +273,20 @@ def tweet_it(string, in_reply_to_status_id=None):
             webbrowser.open(url, new=2)  # 2 = open in a new tab, if possible
 
 
+def tweet_claimed(string, topic, history):
+    """
+    Tweet, having claimed topic in the shared history. If Twitter refuses
+    the update, give the claim back so another instance can post it.
+    On any other failure, or an interrupt, the tweet may have gone out, so
+    keep the claim rather than risk posting it twice.
+    """
+    try:
+        tweet_it(string)
+    except twitter.api.TwitterHTTPError:
+        history.release(topic)
+        raise
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Tweet a trending topic using shm-reduplication.",
@@ -176,6 +299,21 @@ if __name__ == "__main__":
         '-c', '--cache',
         default='/Users/hugo/Dropbox/bin/data/schbot_trends.txt',
         help="File location containing already posted trends")
+    parser.add_argument(
+        '-s', '--shared-history',
+        help="Posted trends shared with other instances, used instead of the "
+             "cache file: an SQLite database for instances on this host, or "
+             "tcp://HOST:PORT of a schhistory.py coordinator for several "
+             "hosts")
+    parser.add_argument(
+        '--similarity', type=schindex.similarity_threshold,
+        help="Also skip trends this similar (0-1) to already posted ones, "
+             "e.g. 0.8")
+    parser.add_argument(
+        '--signatures',
+        default='/Users/hugo/Dropbox/bin/data/schbot_signatures.db',
+        help="File location to keep posted trends' MinHash signatures in "
+             "for --similarity, so they aren't computed again each run")
     parser.add_argument(
         '-nw', '--no-web', action='store_true',
         help="Don't open a web browser to show the tweeted tweet")
@@ -192,8 +330,23 @@ if __name__ == "__main__":
         args.location = random.choice(WOE_IDS.keys())
 
     data = load_yaml(args.yaml)
-    saved_trends = load_list(args.cache)
+    if args.shared_history:
+        history = schhistory.open_history(args.shared_history)
+        saved_trends = history.topics()
+    else:
+        history = None
+        saved_trends = load_list(args.cache)
+    if args.similarity and args.signatures and not args.test:
+        signatures = schindex.SignatureFile(args.signatures)
+    else:
+        signatures = None
+    saved_trends = schindex.TopicIndex(
+        saved_trends, args.similarity, signatures)
+    if signatures is not None:
+        signatures.save()
+        signatures.close()
     print(saved_trends)
+    claiming = history and not args.test
 
     if args.topic:
         intext = args.topic
@@ -207,6 +360,14 @@ if __name__ == "__main__":
         if not trends:
             sys.exit("Nowt found, try later")
 
+        if claiming:
+            # Another instance may have posted these since we looked
+            trends = history.claim(
+                [trend for trend in trends if schpy.topic_schmopic(trend)],
+                limit=1)
+            if not trends:
+                sys.exit("Nowt unclaimed, try later")
+
         for trend in trends:
             intext = trend
             outtext = schpy.topic_schmopic(trend)
@@ -220,11 +381,18 @@ if __name__ == "__main__":
 
     tweet = schpy.print_result(intext, outtext)
 
+    if claiming and args.topic and not history.claim([intext]):
+        sys.exit("Already posted: " + intext)
+
     print("Tweet this:\n", tweet)
     try:
-        tweet_it(tweet)
-        saved_trends.append(intext)
-        save_list(args.cache, saved_trends)
+        if claiming:
+            tweet_claimed(tweet, intext, history)
+        else:
+            tweet_it(tweet)
+        if not history:
+            saved_trends.append(intext)
+            save_list(args.cache, saved_trends)
 
     except twitter.api.TwitterHTTPError as e:
         print("*"*80)
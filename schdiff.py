@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Check that a faster implementation of schpy.schpy or schpy.topic_schmopic
+gives exactly the same output as the reference, over a large corpus of
+real and generated tricky topics.
+
+Functions are named as module:function so worker processes can import them:
+    schdiff.py -c fastschpy:topic_schmopic -n 1000000 -j 4
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import importlib
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+WORDS = [
+    "table", "HOTEL", "breakfast", "group", "apple", "Led Zeppelin",
+    "red and yellow", "schmuck", "bagel", "Joe", "money", "father", "page",
+    "crisis", "street", "rich", "floozie", "floss", "broom", "union", "wig",
+    "witches", "Ashmont", "Ishmael", "ash", "gibberish", "massage", "circus",
+    "schnozz", "terrific", "obscene", "walkman", "Schmidt", "schmooze",
+    "metalinguistic", "sky", "this", "Scotland", "School", "lyrics", "quotes",
+    "Until Dawn", "#CameronMustGo", "Uncharted 4", "#hayesvideo",
+    "#100kHappyBailey", "#XFactorSemiFinal", "#PlayStationExperience",
+    "No Man's Sky", "Mariah", "Yakuza 5", "sniper", "smart",
+    "American Sniper", "FINTECH2015", "#SnotQuotes", "#MCFCvEFC",
+    "#DeflateGate", "#BigBossBash", "Adrian Chiles",
+]
+
+ONSETS = ["", "b", "br", "c", "ch", "cr", "f", "fl", "g", "gr", "h", "j",
+          "k", "kl", "l", "m", "n", "p", "pl", "qu", "r", "s", "sc", "sch",
+          "schm", "schn", "scr", "sh", "sk", "sm", "sn", "sp", "spr", "st",
+          "str", "t", "th", "tr", "v", "w", "wr", "x", "y", "z"]
+NUCLEI = ["a", "e", "i", "o", "u", "y", "ai", "ee", "oo", "ou"]
+CODAS = ["", "b", "ck", "d", "g", "l", "ll", "m", "n", "ng", "p", "rd",
+         "s", "sh", "ss", "t", "th", "x", "zz"]
+
+
+def generate_word(rand):
+    word = "".join(
+        rand.choice(ONSETS) + rand.choice(NUCLEI) + rand.choice(CODAS)
+        for _ in range(rand.randint(1, 3)))
+    # Sometimes no vowels at all
+    if rand.random() < 0.02:
+        word = "".join(c for c in word if c not in "aeiou") or "y"
+    return word
+
+
+def generate_topic(rand):
+    words = [generate_word(rand) for _ in range(rand.randint(1, 3))]
+    style = rand.random()
+    if style < 0.3:
+        words = [word.title() for word in words]
+    elif style < 0.4:
+        words = [word.upper() for word in words]
+    elif style < 0.5:
+        words = [words[0].title()] + words[1:]
+
+    if rand.random() < 0.5:
+        topic = "#" + "".join(
+            word[0].upper() + word[1:] for word in words)
+    else:
+        topic = " ".join(words)
+
+    digits = rand.random()
+    if digits < 0.1:
+        topic = topic + " " + str(rand.randint(0, 2016))
+    elif digits < 0.2:
+        topic = topic + str(rand.randint(0, 2016))
+    elif digits < 0.25:
+        topic = topic.replace("#", "#" + str(rand.randint(1, 100)) + "k")
+    return topic
+
+
+def corpus(size, seed=0):
+    """
+    Yield the known topics, then generated ones, size in total.
+    """
+    rand = random.Random(seed)
+    for topic in itertools.islice(WORDS, size):
+        yield topic
+    for _ in range(size - len(WORDS)):
+        yield generate_topic(rand)
+
+
+def load_function(name):
+    module_name, function_name = name.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def call(function, text):
+    """
+    Exceptions are part of the output, so they must match too.
+    """
+    try:
+        return function(text)
+    except Exception as e:
+        return "<{0}>".format(type(e).__name__)
+
+
+def minimize(text, reference, candidate):
+    """
+    Shrink a mismatching input by deleting words, then characters,
+    while it still mismatches.
+    @return smallest mismatching input found (string)
+    """
+    def mismatch(t):
+        return call(reference, t) != call(candidate, t)
+
+    changed = True
+    while changed:
+        changed = False
+        words = text.split(" ")
+        for i in range(len(words)):
+            shorter = " ".join(words[:i] + words[i + 1:])
+            if shorter and mismatch(shorter):
+                text = shorter
+                changed = True
+                break
+        if changed:
+            continue
+        for i in range(len(text)):
+            shorter = text[:i] + text[i + 1:]
+            if shorter and mismatch(shorter):
+                text = shorter
+                changed = True
+                break
+    return text
+
+
+def check_chunk(job):
+    """
+    Run a chunk of the corpus through both functions. Only the first
+    max_mismatches mismatches are minimized and kept; the rest are counted.
+    @return count, timings, mismatch count and mismatches (tuple)
+    """
+    reference_name, candidate_name, chunk, max_mismatches = job
+    reference = load_function(reference_name)
+    candidate = load_function(candidate_name)
+
+    # topic_schmopic prints as it goes
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        started = time.time()
+        expected = [call(reference, text) for text in chunk]
+        reference_time = time.time() - started
+
+        started = time.time()
+        actual = [call(candidate, text) for text in chunk]
+        candidate_time = time.time() - started
+
+        mismatch_count = 0
+        mismatches = []
+        for text, want, got in zip(chunk, expected, actual):
+            if want == got:
+                continue
+            mismatch_count += 1
+            if len(mismatches) < max_mismatches:
+                small = minimize(text, reference, candidate)
+                mismatches.append((text, want, got, small,
+                                   call(reference, small),
+                                   call(candidate, small)))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return (len(chunk), reference_time, candidate_time, mismatch_count,
+            mismatches)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def compare(reference, candidate, texts, processes=None, chunk_size=1000,
+            max_mismatches=20):
+    """
+    Run texts through reference and candidate (module:function names),
+    spread across processes worker processes. Keeps at most
+    max_mismatches minimized mismatches, but counts them all.
+    @return report (dict)
+    """
+    jobs = ((reference, candidate, chunk, max_mismatches)
+            for chunk in chunks(texts, chunk_size))
+    if processes == 1:
+        results = map(check_chunk, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(check_chunk, jobs)
+
+    count = mismatch_count = 0
+    reference_time = candidate_time = 0.0
+    mismatches = []
+    started = time.time()
+    try:
+        for (chunk_count, ref_time, cand_time, chunk_mismatch_count,
+             chunk_mismatches) in results:
+            count += chunk_count
+            reference_time += ref_time
+            candidate_time += cand_time
+            mismatch_count += chunk_mismatch_count
+            mismatches.extend(
+                chunk_mismatches[:max_mismatches - len(mismatches)])
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    wall = time.time() - started
+
+    return {
+        'count': count,
+        'mismatch_count': mismatch_count,
+        'mismatches': mismatches,
+        'reference_seconds': reference_time,
+        'candidate_seconds': candidate_time,
+        'reference_per_second':
+            count / reference_time if reference_time else 0,
+        'candidate_per_second':
+            count / candidate_time if candidate_time else 0,
+        'wall_seconds': wall,
+    }
+
+
+def print_report(report, reference, candidate):
+    for text, want, got, small, small_want, small_got in \
+            report['mismatches']:
+        print("-"*80)
+        print("Input:    ", repr(text))
+        print(reference + ":", repr(want))
+        print(candidate + ":", repr(got))
+        print("Minimized:", repr(small), "->", repr(small_want), "vs",
+              repr(small_got))
+    if report['mismatches']:
+        print("-"*80)
+    if report['mismatch_count'] > len(report['mismatches']):
+        print("Showing the first", len(report['mismatches']), "mismatches")
+
+    print("Checked {0} inputs in {1:.2f}s, {2} mismatches".format(
+        report['count'], report['wall_seconds'], report['mismatch_count']))
+    print("{0}: {1:.0f}/s".format(reference, report['reference_per_second']))
+    print("{0}: {1:.0f}/s".format(candidate, report['candidate_per_second']))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare a candidate schpy implementation with the "
+                    "reference.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '-r', '--reference', default="schpy:topic_schmopic",
+        help="Reference function, as module:function")
+    parser.add_argument(
+        '-c', '--candidate', required=True,
+        help="Candidate function, as module:function")
+    parser.add_argument(
+        '-n', '--size', type=int, default=100000,
+        help="Number of inputs to check")
+    parser.add_argument(
+        '-s', '--seed', type=int, default=0,
+        help="Random seed for generated inputs")
+    parser.add_argument(
+        '-j', '--processes', type=int,
+        help="Number of worker processes, default one per CPU")
+    parser.add_argument(
+        '-m', '--max-mismatches', type=int, default=20,
+        help="Number of mismatches to minimize and show")
+    args = parser.parse_args()
+
+    report = compare(args.reference, args.candidate,
+                     corpus(args.size, args.seed), args.processes,
+                     max_mismatches=args.max_mismatches)
+    print_report(report, args.reference, args.candidate)
+    if report['mismatch_count']:
+        sys.exit(1)
+
+# End of file
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Shared history of posted topics, so that several schbot instances can run
+at once and each topic is posted by exactly one of them.
+
+An instance claims topics before posting them. A claim is atomic: if two
+instances claim the same topic, only one gets it. Topics are compared by
+schindex.normalize_topic, so "#DeflateGate" and "Deflate Gate" are the same.
+
+Instances on one host can share an SQLite database directly. Instances on
+several hosts go through a coordinator, which keeps the database on its
+own host:
+    schhistory.py schbot_trends.db --serve 0.0.0.0:8754
+    schbot.py --shared-history tcp://coordinator:8754
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import io
+import json
+import os
+import socket
+import sqlite3
+import time
+
+try:
+    import socketserver
+except ImportError:  # Python 2
+    import SocketServer as socketserver
+
+import schindex
+
+
+def default_instance():
+    return "{0}:{1}".format(socket.gethostname(), os.getpid())
+
+
+class History(object):
+    """
+    Base class for history backends.
+    """
+    def topics(self):
+        """
+        @return all posted or claimed topics (list)
+        """
+        raise NotImplementedError
+
+    def claim(self, topics, limit=None):
+        """
+        Try to claim each topic in turn, in a single round trip,
+        stopping after limit successful claims.
+        @return claimed topics, in the order given (list)
+        """
+        raise NotImplementedError
+
+    def release(self, topic):
+        """
+        Give back a claimed topic, e.g. if tweeting it failed.
+        """
+        raise NotImplementedError
+
+
+class SQLiteHistory(History):
+    """
+    History in an SQLite database in WAL mode, so readers don't block the
+    claiming writer. WAL needs shared memory, so all instances must be on
+    the same host, and the database not on a network filesystem. For
+    instances on several hosts, use a Coordinator and TCPHistory.
+    """
+    def __init__(self, filename, instance=None, timeout=30):
+        self.instance = instance or default_instance()
+        self.connection = sqlite3.connect(
+            filename, timeout=timeout, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS topics ("
+            "key TEXT PRIMARY KEY, topic TEXT NOT NULL, "
+            "instance TEXT NOT NULL, claimed_at REAL NOT NULL)")
+
+    def topics(self):
+        return [row[0] for row in self.connection.execute(
+            "SELECT topic FROM topics ORDER BY claimed_at")]
+
+    def claim(self, topics, limit=None):
+        claimed = []
+        if limit is not None and limit <= 0:
+            return claimed
+        now = time.time()
+        cursor = self.connection.cursor()
+        # Take the write lock up front so the batch is one transaction
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for topic in topics:
+                key = schindex.normalize_topic(topic)
+                cursor.execute(
+                    "INSERT OR IGNORE INTO topics VALUES (?, ?, ?, ?)",
+                    (key, topic, self.instance, now))
+                if cursor.rowcount == 1:
+                    claimed.append(topic)
+                    if limit is not None and len(claimed) >= limit:
+                        break
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+        return claimed
+
+    def release(self, topic):
+        self.connection.execute(
+            "DELETE FROM topics WHERE key = ? AND instance = ?",
+            (schindex.normalize_topic(topic), self.instance))
+
+    def close(self):
+        self.connection.close()
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    """
+    Answer one JSON request line with one JSON response line, using the
+    server's database on behalf of the requesting instance.
+    Clients that connect but don't send a request are dropped after
+    timeout seconds.
+    """
+    timeout = 10
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            history = SQLiteHistory(self.server.filename,
+                                    request['instance'])
+            try:
+                op = request['op']
+                if op == 'topics':
+                    result = history.topics()
+                elif op == 'claim':
+                    result = history.claim(request['topics'],
+                                           request.get('limit'))
+                elif op == 'release':
+                    result = history.release(request['topic'])
+                else:
+                    raise ValueError("Unknown op: {0}".format(op))
+            finally:
+                history.close()
+            response = {'result': result}
+        except Exception as e:
+            response = {'error': "{0}: {1}".format(type(e).__name__, e)}
+        self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class Coordinator(socketserver.ThreadingTCPServer):
+    """
+    Serves an SQLite history to TCPHistory clients on other hosts.
+    Each request is handled in its own thread with its own connection to
+    the database, on the coordinator's host, so a slow client doesn't hold
+    up the others and the database never needs to be on a network
+    filesystem. Claims are still atomic, as SQLite serializes the writers.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, filename, address):
+        socketserver.ThreadingTCPServer.__init__(
+            self, address, CoordinatorHandler)
+        self.filename = filename
+
+
+class TCPHistory(History):
+    """
+    History kept by a Coordinator, one round trip per call.
+    """
+    def __init__(self, host, port, instance=None, timeout=30):
+        self.address = (host, port)
+        self.instance = instance or default_instance()
+        self.timeout = timeout
+
+    def _request(self, op, **kwargs):
+        kwargs.update(op=op, instance=self.instance)
+        sock = socket.create_connection(self.address, self.timeout)
+        try:
+            sock.sendall(json.dumps(kwargs).encode('utf-8') + b'\n')
+            f = sock.makefile('rb')
+            try:
+                line = f.readline()
+            finally:
+                f.close()
+        finally:
+            sock.close()
+        if not line:
+            raise IOError("No response from coordinator")
+        response = json.loads(line.decode('utf-8'))
+        if 'error' in response:
+            raise IOError("Coordinator error: " + response['error'])
+        return response['result']
+
+    def topics(self):
+        return self._request('topics')
+
+    def claim(self, topics, limit=None):
+        return self._request('claim', topics=list(topics), limit=limit)
+
+    def release(self, topic):
+        self._request('release', topic=topic)
+
+    def close(self):
+        pass
+
+
+def open_history(location, instance=None):
+    """
+    @return TCPHistory for "tcp://host:port", else SQLiteHistory for a
+        database filename
+    """
+    if location.startswith("tcp://"):
+        host, port = location[len("tcp://"):].rsplit(":", 1)
+        return TCPHistory(host, int(port), instance)
+    return SQLiteHistory(location, instance)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show or import a shared history of posted topics.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('database', help="SQLite database of posted topics")
+    parser.add_argument(
+        '-i', '--import-list',
+        help="Claim each topic in this schbot_trends.txt-style file")
+    parser.add_argument(
+        '--serve', metavar='HOST:PORT',
+        help="Run a coordinator for instances on other hosts")
+    args = parser.parse_args()
+
+    history = SQLiteHistory(args.database)
+    if args.serve:
+        host, port = args.serve.rsplit(":", 1)
+        print("Serving", args.database, "on", args.serve)
+        Coordinator(args.database, (host, int(port))).serve_forever()
+    elif args.import_list:
+        with io.open(args.import_list, encoding='unicode-escape') as f:
+            topics = [line.rstrip('\n') for line in f]
+        print("Imported", len(history.claim(topics)), "topics")
+    else:
+        for topic in history.topics():
+            print(topic)
+
+# End of file
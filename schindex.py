@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Index of already posted topics, so that "#DeflateGate", "Deflate Gate" and
+"deflategate" count as the same topic.
+
+Hashes, spacing, punctuation and case are dropped to make a key, so word
+boundaries don't matter: a camel case hashtag, the same words spaced out,
+and the same words all in lower case share a key.
+Optionally, near duplicates ("#DeflateGates") are found with MinHash over
+character shingles of the key, bucketed by locality-sensitive hashing.
+MinHash signatures are the same in every process, so they can be kept in a
+SignatureFile rather than computed again each run.
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import hashlib
+import sqlite3
+import struct
+
+SHINGLE_SIZE = 3
+NUM_HASHES = 64
+# Chance that a topic exactly at the similarity threshold is found
+RECALL = 0.99
+# Fewer rows per band than this make so many candidates that lookups in a
+# large index get slow, so low thresholds trade recall for speed
+MIN_ROWS = 4
+# Bump when the signatures change, so SignatureFiles start again
+SIGNATURE_VERSION = 1
+
+# Each shingle's SHA-512 digests, with NUM_HASHES // 16 different prefixes,
+# give NUM_HASHES 32-bit hashes, each standing in for a random permutation.
+# Unlike hash(), these don't change between processes.
+_SIGNATURE = struct.Struct(str("<{0}I".format(NUM_HASHES)))
+_PREFIXES = [hashlib.sha512(struct.pack(str("<I"), i))
+             for i in range(_SIGNATURE.size // hashlib.sha512().digest_size)]
+# Shingles are shared by many topics, so remember their hashes, up to a point
+_SHINGLE_HASHES = {}
+_SHINGLE_HASHES_SIZE = 100000
+
+
+def normalize_topic(topic):
+    """
+    normalize_topic("#DeflateGate") == "deflategate"
+    normalize_topic("Deflate Gate") == "deflategate"
+    """
+    key = "".join(c for c in topic.lower() if c.isalnum())
+    # Don't lump together all topics that are only punctuation
+    return key or topic.lower()
+
+
+def shingles(key):
+    """
+    @return overlapping character substrings of key (set)
+    """
+    if len(key) <= SHINGLE_SIZE:
+        return {key}
+    return {key[i:i + SHINGLE_SIZE]
+            for i in range(len(key) - SHINGLE_SIZE + 1)}
+
+
+def shingle_hashes(shingle):
+    """
+    @return NUM_HASHES hashes of shingle (tuple)
+    """
+    hashes = _SHINGLE_HASHES.get(shingle)
+    if hashes is None:
+        digests = []
+        for prefix in _PREFIXES:
+            digest = prefix.copy()
+            digest.update(shingle.encode('utf-8'))
+            digests.append(digest.digest())
+        hashes = _SIGNATURE.unpack(b"".join(digests))
+        if len(_SHINGLE_HASHES) >= _SHINGLE_HASHES_SIZE:
+            _SHINGLE_HASHES.clear()
+        _SHINGLE_HASHES[shingle] = hashes
+    return hashes
+
+
+def minhash(shingle_set):
+    """
+    @return minimum of each of the NUM_HASHES hashes over shingle_set (tuple)
+    """
+    return tuple(map(min, zip(*map(shingle_hashes, shingle_set))))
+
+
+def jaccard(a, b):
+    return float(len(a & b)) / len(a | b)
+
+
+def lsh_rows(threshold):
+    """
+    Choose how many MinHash values go in each LSH band: as many as
+    possible, for fewer false candidates, while a pair with similarity
+    threshold still shares a band with probability RECALL.
+    Lower thresholds need fewer rows, but never fewer than MIN_ROWS, so
+    below about 0.75 recall falls short of RECALL.
+    @return rows per band (int)
+    """
+    for rows in range(NUM_HASHES, MIN_ROWS, -1):
+        bands = NUM_HASHES // rows
+        if 1 - (1 - threshold ** rows) ** bands >= RECALL:
+            return rows
+    return MIN_ROWS
+
+
+def similarity_threshold(string):
+    """
+    argparse type for a similarity threshold, more than 0 and at most 1.
+    """
+    value = float(string)
+    if not 0 < value <= 1:
+        raise argparse.ArgumentTypeError(
+            "similarity must be more than 0 and at most 1, not {0}".format(
+                string))
+    return value
+
+
+class SignatureFile(dict):
+    """
+    MinHash signatures of normalized keys, packed as bytes, kept in an
+    SQLite database so a large TopicIndex needn't hash every posted topic
+    again each run. Pass it as a TopicIndex's signatures, then save().
+    """
+    def __init__(self, filename):
+        dict.__init__(self)
+        self.connection = sqlite3.connect(filename)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SIGNATURE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS signatures")
+            self.connection.execute(
+                "PRAGMA user_version = {0:d}".format(SIGNATURE_VERSION))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "key TEXT PRIMARY KEY, minhash BLOB NOT NULL)")
+        self.update((key, bytes(signature)) for key, signature in
+                    self.connection.execute("SELECT * FROM signatures"))
+        self._new = set()
+
+    def __setitem__(self, key, signature):
+        dict.__setitem__(self, key, signature)
+        self._new.add(key)
+
+    def save(self):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO signatures VALUES (?, ?)",
+                ((key, sqlite3.Binary(self[key])) for key in self._new))
+        self._new.clear()
+
+    def close(self):
+        self.connection.close()
+
+
+class TopicIndex(object):
+    """
+    Posted topics, looked up by normalized key.
+    Behaves like the list it replaces: append(), iteration and len().
+
+    If threshold is given, `in` also matches topics whose keys have a
+    shingle Jaccard similarity of at least threshold. The bands are sized
+    from threshold (see lsh_rows), but MinHash is approximate, so a few
+    such topics may still be missed. Without threshold no MinHash buckets
+    are kept, and near_duplicates() finds nothing.
+
+    signatures, e.g. a SignatureFile, maps keys to packed MinHash
+    signatures: appended topics' signatures are looked up in it first, and
+    added to it if missing.
+    """
+    def __init__(self, topics=(), threshold=None, signatures=None):
+        if threshold is not None and not 0 < threshold <= 1:
+            raise ValueError(
+                "threshold must be more than 0 and at most 1, not {0}".format(
+                    threshold))
+        self.threshold = threshold
+        self.signatures = signatures
+        if threshold is not None:
+            self._rows = lsh_rows(threshold)
+            self._bands_count = NUM_HASHES // self._rows
+        self._topics = []
+        self._keys = set()
+        self._buckets = {}
+        for topic in topics:
+            self.append(topic)
+
+    def append(self, topic):
+        self._topics.append(topic)
+        key = normalize_topic(topic)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        if self.threshold is not None:
+            for bucket in self._bands(key, self.signatures):
+                self._buckets.setdefault(bucket, []).append(key)
+
+    def _bands(self, key, signatures=None):
+        if signatures is None:
+            signature = minhash(shingles(key))
+        else:
+            packed = signatures.get(key)
+            if packed is None:
+                signature = minhash(shingles(key))
+                signatures[key] = _SIGNATURE.pack(*signature)
+            else:
+                signature = _SIGNATURE.unpack(packed)
+        rows = self._rows
+        return [hash((i,) + signature[i * rows:(i + 1) * rows])
+                for i in range(self._bands_count)]
+
+    def near_duplicates(self, topic):
+        """
+        @return normalized keys at least threshold similar to topic's,
+            most similar first (list)
+        """
+        if self.threshold is None:
+            return []
+        key = normalize_topic(topic)
+        candidates = set()
+        for bucket in self._bands(key):
+            candidates.update(self._buckets.get(bucket, ()))
+        key_shingles = shingles(key)
+        scored = [(jaccard(key_shingles, shingles(candidate)), candidate)
+                  for candidate in candidates]
+        return [candidate for score, candidate in sorted(scored, reverse=True)
+                if score >= self.threshold]
+
+    def __contains__(self, topic):
+        if normalize_topic(topic) in self._keys:
+            return True
+        return (self.threshold is not None and
+                bool(self.near_duplicates(topic)))
+
+    def __iter__(self):
+        return iter(self._topics)
+
+    def __len__(self):
+        return len(self._topics)
+
+    def __repr__(self):
+        return repr(self._topics)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show the normalized key of a topic.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('topic', nargs='+', help="Topic to normalize")
+    args = parser.parse_args()
+
+    for topic in args.topic:
+        print(topic, "->", normalize_topic(topic))
+
+# End of file
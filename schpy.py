@@ -8,10 +8,16 @@ https://www.academia.edu/209796/Metalinguistic_shmetalinguistic_The_phonology_of
 from __future__ import print_function, unicode_literals
 import argparse
 import random
+from collections import namedtuple
 
 
 CONSONANTS = "bcdfghjklmnpqrstvwxyz"
 TERMINATORS = ["!", "..."]
+PREFIXES = ["schm", "shm", "shp", "sm"]
+
+# The phrase's words before the last one, the last word in lower case, what
+# follows its onset, and its case: "upper", "title" or None
+Reduplicant = namedtuple("Reduplicant", "words word rest case")
 
 
 def is_vowel(char, i=0):
@@ -57,52 +63,93 @@ def startswith_consonants(word, final_consonant_in_cluster=False):
     return False
 
 
-def schpy(phrase):
+def analyse(phrase):
+    """
+    Do the prefix-independent work: find the last word, lower case it,
+    and find what's left once its onset is replaced.
+    @return analysis (Reduplicant) or None if phrase has no words
+    """
     words = phrase.split()
     if not words:
-        return ""
+        return None
     last_word = words[-1].lower()
 
     if last_word.startswith("schm"):
-        last_word = "schn" + last_word[4:]
+        rest = last_word[4:]
     elif last_word.startswith("schn"):
-        last_word = "schm" + last_word[4:]
+        rest = last_word[4:]
     elif last_word.startswith("sm"):
-        last_word = "schm" + last_word[2:]
+        rest = last_word[2:]
     elif last_word.startswith("sn"):
-        last_word = "schm" + last_word[2:]
+        rest = last_word[2:]
     elif last_word.startswith("qu"):
-        last_word = "schm" + last_word[2:]
+        rest = last_word[2:]
     elif(startswith_consonants(last_word, "rlk")):
         v_pos = first_vowel(last_word)
-        last_word = "schm" + last_word[v_pos:]
+        rest = last_word[v_pos:]
 #     elif last_word[0] in CONSONANTS and last_word[1] in CONSONANTS:
-#         last_word = "schm" + last_word[1:]
+#         rest = last_word[1:]
     # CONSONANT-VOWEL-
     elif (last_word[0] in CONSONANTS and
           last_word[1] not in CONSONANTS):
-        last_word = "schm" + last_word[1:]
+        rest = last_word[1:]
     # CONSONANT-CONSONANT-VOWEL-
     elif (last_word[0] in CONSONANTS and
           last_word[1] in CONSONANTS and
           last_word[2] not in CONSONANTS):
-        last_word = "schm" + last_word[2:]
+        rest = last_word[2:]
     elif last_word[0] not in CONSONANTS:
-        last_word = "schm" + last_word
+        rest = last_word
     else:
-        # schm-[FIRST-VOWEL]-
+        # [FIRST-VOWEL]-
         v_pos = first_vowel(last_word)
-        last_word = "schm" + last_word[v_pos:]
+        rest = last_word[v_pos:]
 
     # ALL CAPS
     if words[-1].isupper():
-        last_word = last_word.upper()
+        case = "upper"
     # Initial Caps
     elif words[-1].istitle():
+        case = "title"
+    else:
+        case = None
+
+    return Reduplicant(words[:-1], last_word, rest, case)
+
+
+def render(analysis, prefix="schm"):
+    """
+    Put prefix onto an analysed phrase.
+    If that just gives back the original word (schmuck), change the last
+    letter of the prefix instead (schnuck).
+    """
+    if analysis is None:
+        return ""
+
+    last_word = prefix + analysis.rest
+    if last_word == analysis.word:
+        last_word = (prefix[:-1] + ("n" if prefix.endswith("m") else "m") +
+                     analysis.rest)
+
+    if analysis.case == "upper":
+        last_word = last_word.upper()
+    elif analysis.case == "title":
         last_word = last_word.title()
 
-    words = words[:-1] + [last_word]
-    return " ".join(words)
+    return " ".join(analysis.words + [last_word])
+
+
+def schpy(phrase, prefix="schm"):
+    return render(analyse(phrase), prefix)
+
+
+def schpy_variants(phrase, prefixes=PREFIXES):
+    """
+    Like schpy, for each prefix, analysing phrase only once.
+    @return outputs in the same order as prefixes (list)
+    """
+    analysis = analyse(phrase)
+    return [render(analysis, prefix) for prefix in prefixes]
 
 
 def camel_case_to_spaced(string):
@@ -121,10 +168,18 @@ def camel_case_to_spaced(string):
     return " ".join(words)
 
 
-def topic_schmopic(topic):
+def topic_schmopic(topic, prefix="schm"):
     """
     Split a phrase into words. Hashtags may be camel case.
     """
+    return topic_schmopic_variants(topic, [prefix])[0]
+
+
+def topic_schmopic_variants(topic, prefixes=PREFIXES):
+    """
+    Like topic_schmopic, for each prefix, analysing topic only once.
+    @return outputs in the same order as prefixes (list)
+    """
     hashtag = False
     if topic[0] == "#":
         hashtag = True
@@ -134,22 +189,29 @@ def topic_schmopic(topic):
     splitted = topic.split()
     try:
         int(splitted[-1])
-        return False
+        return [False] * len(prefixes)
     except ValueError:
         pass
 
+    camel_case = False
     if " " in topic:
-        words = schpy(topic)
+        analysis = analyse(topic)
     elif topic.isupper():  # "ABC123" also True
-        words = schpy(topic)
+        analysis = analyse(topic)
     else:
-        words = schpy(camel_case_to_spaced(topic))
-        words = words.replace(" ", "")
+        camel_case = True
+        analysis = analyse(camel_case_to_spaced(topic))
 
-    if hashtag:
-        words = "#" + words
+    variants = []
+    for prefix in prefixes:
+        words = render(analysis, prefix)
+        if camel_case:
+            words = words.replace(" ", "")
+        if hashtag:
+            words = "#" + words
+        variants.append(words)
 
-    return words
+    return variants
 
 
 def print_result(intext, outtext):
@@ -165,15 +227,18 @@ if __name__ == "__main__":
     parser.add_argument('-p', '--phrase', help="Phrase to convert")
     parser.add_argument('-t', '--topic',
                         help="Twitter trending topic to convert")
+    parser.add_argument('-x', '--prefix', nargs='+', default=["schm"],
+                        help="Reduplicant prefixes, e.g. schm shm shp")
     args = parser.parse_args()
 
     if args.phrase:
         intext = args.phrase
-        outtext = schpy(args.phrase)
+        outtexts = schpy_variants(args.phrase, args.prefix)
     elif args.topic:
         intext = args.topic
-        outtext = topic_schmopic(args.topic)
+        outtexts = topic_schmopic_variants(args.topic, args.prefix)
 
-    print_result(intext, outtext)
+    for outtext in outtexts:
+        print_result(intext, outtext)
 
 # End of file
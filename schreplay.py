@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Record trending topic payloads from Twitter, and replay them through the
+schbot pipeline on a virtual clock to see how the bot behaves over days or
+weeks of trends in a few seconds.
+
+Record (every 15 minutes, 96 times = one day):
+    schreplay.py record -o trends.jsonl -i 900 -n 96
+
+Replay (in test mode, nothing is tweeted or saved):
+    schreplay.py replay trends.jsonl
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+import schbot
+import schindex
+import schpy
+
+
+class VirtualClock(object):
+    """
+    A clock that only moves when told to.
+    If speed is given, sleep for the elapsed virtual time divided by speed,
+    otherwise don't sleep at all.
+    """
+    def __init__(self, start=0.0, speed=None):
+        self.start = start
+        self.now = start
+        self.speed = speed
+
+    def advance_to(self, when):
+        if when > self.now and self.speed:
+            time.sleep((when - self.now) / self.speed)
+        self.now = max(self.now, when)
+
+    def elapsed(self):
+        return self.now - self.start
+
+
+class _Endpoint(object):
+    def __init__(self, methods):
+        self.__dict__.update(methods)
+
+
+class ReplayTwitter(object):
+    """
+    Stands in for schbot's twitter.Twitter clients, answering
+    trends/place.json with the currently replayed response body.
+    """
+    def __init__(self):
+        self.responses = {}
+        self.trends = _Endpoint({"place.json": self._place})
+        self.statuses = _Endpoint({"update": self._update})
+
+    def _place(self, _id):
+        return self.responses[_id]
+
+    def _update(self, **kwargs):
+        raise RuntimeError("Replay must run in test mode")
+
+
+class CountingTopicIndex(schindex.TopicIndex):
+    """
+    A TopicIndex that counts the lookups schbot makes, and how many were
+    already posted, so replay needn't look every trend up again.
+    """
+    def __init__(self, topics=(), threshold=None):
+        schindex.TopicIndex.__init__(self, topics, threshold)
+        self.lookups = self.hits = 0
+
+    def __contains__(self, topic):
+        found = schindex.TopicIndex.__contains__(self, topic)
+        self.lookups += 1
+        self.hits += found
+        return found
+
+
+_MISSING = object()
+# schbot's globals that replay replaces for the duration
+_PATCHED = ('args', 'saved_trends', 'TWITTER', 'TWITTER_RAW')
+
+
+def load_records(filename):
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def record(filename, locations, interval, count):
+    """
+    Append count trends/place response bodies for each location to
+    filename, one JSON object per line, interval seconds apart.
+    """
+    for n in range(count):
+        if n:
+            time.sleep(interval)
+        with open(filename, 'a') as f:
+            for location in locations:
+                raw = schbot.fetch_raw_trends(schbot.WOE_IDS[location])
+                f.write(json.dumps({
+                    'time': time.time(),
+                    'location': location,
+                    'raw': raw}) + '\n')
+        print("Recorded", n + 1, "of", count)
+
+
+def replay(filename, speed=None, history=None, similarity=None):
+    """
+    Drive get_trending_topics_from_twitter -> topic_schmopic -> tweet_it
+    (test mode) with each recorded payload in turn.
+    @return report (dict)
+    """
+    fake = ReplayTwitter()
+    clock = None
+    saved_trends = CountingTopicIndex(history or [], similarity)
+    cycles = posts = 0
+
+    devnull = open(os.devnull, 'w')
+    stdout = sys.stdout
+    originals = dict((name, getattr(schbot, name, _MISSING))
+                     for name in _PATCHED)
+    schbot.args = argparse.Namespace(test=True, no_web=True)
+    schbot.saved_trends = saved_trends
+    schbot.TWITTER = schbot.TWITTER_RAW = fake
+
+    if tracemalloc:
+        tracemalloc.start()
+    started = time.time()
+    try:
+        sys.stdout = devnull
+        for rec in load_records(filename):
+            if clock is None:
+                clock = VirtualClock(rec['time'], speed)
+            clock.advance_to(rec['time'])
+            cycles += 1
+
+            fake.responses[schbot.WOE_IDS[rec['location']]] = rec['raw']
+            trends = schbot.get_trending_topics_from_twitter(rec['location'])
+            if not trends:
+                continue
+
+            # Like schbot's main: only the first kept trend is tried
+            intext = trends[0]
+            outtext = schpy.topic_schmopic(intext)
+            if not outtext:
+                continue
+
+            schbot.tweet_it(schpy.print_result(intext, outtext))
+            saved_trends.append(intext)
+            posts += 1
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+        for name, value in originals.items():
+            if value is _MISSING:
+                delattr(schbot, name)
+            else:
+                setattr(schbot, name, value)
+        wall = time.time() - started
+        if tracemalloc:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            peak = None
+
+    trends_seen = saved_trends.lookups
+    duplicates = saved_trends.hits
+    virtual = clock.elapsed() if clock else 0.0
+    hours = virtual / 3600.0
+    return {
+        'cycles': cycles,
+        'posts': posts,
+        'trends_seen': trends_seen,
+        'duplicates': duplicates,
+        'duplicate_rate':
+            float(duplicates) / trends_seen if trends_seen else 0,
+        'history_size': len(saved_trends),
+        'history_bytes': sum(len(s.encode('utf-8')) for s in saved_trends),
+        'virtual_hours': hours,
+        'posts_per_hour': posts / hours if hours else 0,
+        'wall_seconds': wall,
+        'cycles_per_second': cycles / wall if wall else 0,
+        'speedup': virtual / wall if wall else 0,
+        'peak_memory_bytes': peak,
+    }
+
+
+def print_report(report):
+    for key in sorted(report):
+        value = report[key]
+        if isinstance(value, float):
+            value = "{0:.3f}".format(value)
+        print("{0:>20}: {1}".format(key, value))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Record and replay trending topics for schbot.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+
+    record_parser = subparsers.add_parser(
+        'record', help="Record trending topic payloads",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    record_parser.add_argument(
+        '-y', '--yaml',
+        default='/Users/hugo/Dropbox/bin/data/schbot.yaml',
+        help="YAML file location containing Twitter keys and secrets")
+    record_parser.add_argument(
+        '-o', '--output', default='schbot_replay.jsonl',
+        help="File to append recorded payloads to")
+    record_parser.add_argument(
+        '-l', '--location', nargs='+', default=sorted(schbot.WOE_IDS),
+        choices=sorted(schbot.WOE_IDS),
+        help="Locations of trending topics")
+    record_parser.add_argument(
+        '-i', '--interval', type=float, default=900,
+        help="Seconds between recordings")
+    record_parser.add_argument(
+        '-n', '--count', type=int, default=1,
+        help="Number of recordings to make")
+
+    replay_parser = subparsers.add_parser(
+        'replay', help="Replay recorded payloads in test mode",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    replay_parser.add_argument('input', help="File of recorded payloads")
+    replay_parser.add_argument(
+        '-s', '--speed', type=float,
+        help="Times faster than real time, or as fast as possible if unset")
+    replay_parser.add_argument(
+        '-c', '--cache',
+        help="File location containing already posted trends to start from")
+    replay_parser.add_argument(
+        '--similarity', type=schindex.similarity_threshold,
+        help="Also skip trends this similar (0-1) to already posted ones")
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        schbot.data = schbot.load_yaml(args.yaml)
+        record(args.output, args.location, args.interval, args.count)
+    elif args.command == 'replay':
+        history = schbot.load_list(args.cache) if args.cache else []
+        print_report(
+            replay(args.input, args.speed, history, args.similarity))
+    else:
+        parser.print_help()
+
+# End of file
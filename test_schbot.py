@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for schbot.py
+"""
+from __future__ import print_function, unicode_literals
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from urllib.error import HTTPError
+except ImportError:  # Python 2
+    from urllib2 import HTTPError
+
+import twitter
+
+import schbot
+import schhistory
+
+RESPONSE = [{
+    "trends": [
+        {"name": "#DeflateGate", "promoted_content": None,
+         "query": "%23DeflateGate", "tweet_volume": 12345,
+         "url": "http://twitter.com/search?q=%23DeflateGate"},
+        {"name": "Adrian Chiles", "promoted_content": True,
+         "query": "%22Adrian+Chiles%22", "tweet_volume": None,
+         "url": "http://twitter.com/search?q=%22Adrian+Chiles%22"},
+    ],
+    "as_of": "2015-01-23T12:00:00Z",
+    "created_at": "2015-01-23T11:55:00Z",
+    "locations": [{"name": "United Kingdom", "woeid": 23424975}],
+}]
+
+
+class TestDecodeTrends(unittest.TestCase):
+
+    def test_decode(self):
+        intext = json.dumps(RESPONSE)
+        outtext = list(schbot.decode_trends(intext, "UK"))
+        self.assertEqual(outtext, [
+            schbot.Trend("#DeflateGate", False, 12345, "UK"),
+            schbot.Trend("Adrian Chiles", True, None, "UK")])
+
+    def test_decode_empty(self):
+        intext = '[{"trends": [ ], "as_of": "2015-01-23T12:00:00Z"}]'
+        outtext = list(schbot.decode_trends(intext))
+        self.assertEqual(outtext, [])
+
+    def test_raw_same_as_decoded(self):
+        raw = list(schbot.iter_trends(json.dumps(RESPONSE, indent=2), "US"))
+        decoded = list(schbot.iter_trends(RESPONSE, "US"))
+        self.assertEqual(raw, decoded)
+
+    def test_other_keys_first(self):
+        intext = ('[{"locations": [{"name": "x", "trends": [{"name": "no"}]}]'
+                  ', "trends": [{"name": "yes"}]}]')
+        outtext = [trend.name for trend in schbot.decode_trends(intext)]
+        self.assertEqual(outtext, ["yes"])
+
+    def test_nested_trends_key_only(self):
+        intext = '[{"locations": [{"trends": [{"name": "no"}]}]}]'
+        with self.assertRaises(ValueError):
+            list(schbot.decode_trends(intext))
+
+    def test_truncated(self):
+        intext = json.dumps(RESPONSE)
+        adrian = intext.index("Adrian")
+        for end in (0, 5, adrian - 4, adrian + 20, intext.index("]")):
+            with self.assertRaises(ValueError):
+                list(schbot.decode_trends(intext[:end]))
+
+    def test_not_a_list(self):
+        intext = json.dumps({"trends": []})
+        with self.assertRaises(ValueError):
+            list(schbot.decode_trends(intext))
+
+    def test_interned(self):
+        trend1 = schbot.Trend("".join(["Deflate", "Gate"]))
+        trend2 = schbot.Trend("".join(["Deflate", "Gate"]))
+        self.assertIs(trend1.name, trend2.name)
+
+
+class TestTweetClaimed(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        filename = os.path.join(self.tempdir, "schbot_trends.db")
+        self.history = schhistory.SQLiteHistory(filename, "node1")
+        self.other = schhistory.SQLiteHistory(filename, "node2")
+        self.tweet_it = schbot.tweet_it
+
+    def tearDown(self):
+        schbot.tweet_it = self.tweet_it
+        self.history.close()
+        self.other.close()
+        shutil.rmtree(self.tempdir)
+
+    def tweet_fails(self, exception):
+        def tweet_it(string):
+            raise exception
+        schbot.tweet_it = tweet_it
+
+    def test_tweeted(self):
+        schbot.tweet_it = lambda string: None
+        self.history.claim(["#DeflateGate"])
+        schbot.tweet_claimed("#DeflateGate? #DeflateSchmate!",
+                             "#DeflateGate", self.history)
+        self.assertEqual(self.other.claim(["#DeflateGate"]), [])
+
+    def test_released_on_error(self):
+        # Twitter refused the update, so it definitely wasn't posted
+        error = HTTPError("https://api.twitter.com/1.1/statuses/update.json",
+                          403, "Forbidden", {}, io.BytesIO(b""))
+        self.tweet_fails(twitter.api.TwitterHTTPError(
+            error, "api.twitter.com/1.1/statuses/update", "json", {}))
+        self.history.claim(["#DeflateGate"])
+        with self.assertRaises(twitter.api.TwitterHTTPError):
+            schbot.tweet_claimed("#DeflateGate? #DeflateSchmate!",
+                                 "#DeflateGate", self.history)
+        self.assertEqual(self.other.claim(["#DeflateGate"]), ["#DeflateGate"])
+
+    def test_kept_on_other_error(self):
+        # The connection may have dropped after the update went out
+        self.tweet_fails(IOError("Connection reset by peer"))
+        self.history.claim(["#DeflateGate"])
+        with self.assertRaises(IOError):
+            schbot.tweet_claimed("#DeflateGate? #DeflateSchmate!",
+                                 "#DeflateGate", self.history)
+        self.assertEqual(self.other.claim(["#DeflateGate"]), [])
+
+    def test_kept_on_interrupt(self):
+        self.tweet_fails(KeyboardInterrupt())
+        self.history.claim(["#DeflateGate"])
+        with self.assertRaises(KeyboardInterrupt):
+            schbot.tweet_claimed("#DeflateGate? #DeflateSchmate!",
+                                 "#DeflateGate", self.history)
+        self.assertEqual(self.other.claim(["#DeflateGate"]), [])
+
+if __name__ == '__main__':
+    unittest.main()
+
+# End of file
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for schdiff.py
+"""
+from __future__ import print_function, unicode_literals
+import unittest
+
+import schdiff
+import schpy
+
+
+def shm_schpy(phrase):
+    """A candidate that differs from schpy.schpy for vowel-initial words"""
+    if phrase and phrase.split()[-1][0].lower() in "aeiou":
+        return schpy.schpy(phrase).replace("schm", "shm")
+    return schpy.schpy(phrase)
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_corpus_size(self):
+        self.assertEqual(len(list(schdiff.corpus(100))), 100)
+        self.assertEqual(len(list(schdiff.corpus(10))), 10)
+
+    def test_corpus_repeatable(self):
+        self.assertEqual(list(schdiff.corpus(200, seed=1)),
+                         list(schdiff.corpus(200, seed=1)))
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_same(self):
+        report = schdiff.compare(
+            "schpy:topic_schmopic", "schpy:topic_schmopic",
+            schdiff.corpus(500), processes=1, chunk_size=100)
+        self.assertEqual(report['count'], 500)
+        self.assertEqual(report['mismatch_count'], 0)
+        self.assertEqual(report['mismatches'], [])
+
+    def test_different(self):
+        report = schdiff.compare(
+            "schpy:schpy", "test_schdiff:shm_schpy",
+            ["table", "red and yellow apple"], processes=1)
+        self.assertEqual(report['mismatch_count'], 1)
+        self.assertEqual(len(report['mismatches']), 1)
+        text, want, got, small, small_want, small_got = \
+            report['mismatches'][0]
+        self.assertEqual(text, "red and yellow apple")
+        self.assertEqual(want, "red and yellow schmapple")
+        self.assertEqual(got, "red and yellow shmapple")
+        self.assertEqual(len(small), 1)
+        self.assertNotEqual(small_want, small_got)
+
+    def test_max_mismatches(self):
+        texts = ["apple", "egg", "ink", "owl", "up"] * 20
+        report = schdiff.compare(
+            "schpy:schpy", "test_schdiff:shm_schpy", texts,
+            processes=1, chunk_size=30, max_mismatches=3)
+        self.assertEqual(report['count'], 100)
+        self.assertEqual(report['mismatch_count'], 100)
+        self.assertEqual(len(report['mismatches']), 3)
+
+    def test_exceptions_compared(self):
+        self.assertEqual(
+            schdiff.call(schpy.topic_schmopic, ""), "<IndexError>")
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# End of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for schhistory.py
+"""
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import schhistory
+
+
+class TestSQLiteHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "schbot_trends.db")
+        self.node1 = schhistory.SQLiteHistory(self.filename, "node1")
+        self.node2 = schhistory.SQLiteHistory(self.filename, "node2")
+
+    def tearDown(self):
+        self.node1.close()
+        self.node2.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_claim(self):
+        claimed = self.node1.claim(["#DeflateGate", "Adrian Chiles"])
+        self.assertEqual(claimed, ["#DeflateGate", "Adrian Chiles"])
+        self.assertEqual(
+            self.node2.topics(), ["#DeflateGate", "Adrian Chiles"])
+
+    def test_claim_only_once(self):
+        self.node1.claim(["#DeflateGate"])
+        claimed = self.node2.claim(["#DeflateGate", "Adrian Chiles"])
+        self.assertEqual(claimed, ["Adrian Chiles"])
+
+    def test_claim_case_insensitive(self):
+        self.node1.claim(["#DeflateGate"])
+        claimed = self.node2.claim(["#deflategate"])
+        self.assertEqual(claimed, [])
+
+    def test_claim_normalized(self):
+        self.node1.claim(["#DeflateGate"])
+        claimed = self.node2.claim(["Deflate Gate"])
+        self.assertEqual(claimed, [])
+
+    def test_claim_limit(self):
+        self.node1.claim(["a"])
+        claimed = self.node2.claim(["a", "b", "c"], limit=1)
+        self.assertEqual(claimed, ["b"])
+        self.assertEqual(self.node1.topics(), ["a", "b"])
+
+    def test_release(self):
+        self.node1.claim(["#DeflateGate"])
+        self.node2.release("#DeflateGate")
+        self.assertEqual(self.node2.claim(["#DeflateGate"]), [])
+        self.node1.release("#DeflateGate")
+        self.assertEqual(self.node2.claim(["#DeflateGate"]), ["#DeflateGate"])
+
+
+class TestTCPHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "schbot_trends.db")
+        self.coordinator = schhistory.Coordinator(
+            self.filename, ("127.0.0.1", 0))
+        self.thread = threading.Thread(target=self.coordinator.serve_forever)
+        self.thread.start()
+        location = "tcp://127.0.0.1:{0}".format(
+            self.coordinator.server_address[1])
+        self.node1 = schhistory.open_history(location, "node1")
+        self.node2 = schhistory.open_history(location, "node2")
+
+    def tearDown(self):
+        self.coordinator.shutdown()
+        self.coordinator.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tempdir)
+
+    def test_open_history(self):
+        self.assertIsInstance(self.node1, schhistory.TCPHistory)
+        history = schhistory.open_history(self.filename)
+        self.assertIsInstance(history, schhistory.SQLiteHistory)
+        history.close()
+
+    def test_claim_only_once(self):
+        self.assertEqual(self.node1.claim(["#DeflateGate"]), ["#DeflateGate"])
+        claimed = self.node2.claim(["Deflate Gate", "Adrian Chiles"], limit=1)
+        self.assertEqual(claimed, ["Adrian Chiles"])
+        self.assertEqual(
+            self.node1.topics(), ["#DeflateGate", "Adrian Chiles"])
+
+    def test_release(self):
+        self.node1.claim(["#DeflateGate"])
+        self.node2.release("#DeflateGate")
+        self.assertEqual(self.node2.claim(["#DeflateGate"]), [])
+        self.node1.release("#DeflateGate")
+        self.assertEqual(self.node2.claim(["#DeflateGate"]), ["#DeflateGate"])
+
+    def test_error(self):
+        with self.assertRaises(IOError):
+            self.node1._request('explode')
+
+    def test_idle_client(self):
+        # A client that connects and says nothing mustn't block the others
+        idle = socket.create_connection(self.coordinator.server_address)
+        try:
+            node = schhistory.TCPHistory(
+                "127.0.0.1", self.coordinator.server_address[1], "node3",
+                timeout=2)
+            self.assertEqual(node.claim(["#DeflateGate"]), ["#DeflateGate"])
+        finally:
+            idle.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# End of file
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for schindex.py
+"""
+from __future__ import print_function, unicode_literals
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import schdiff
+import schindex
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_normalize_hashtag(self):
+        intext = "#DeflateGate"
+        outtext = schindex.normalize_topic(intext)
+        self.assertEqual(outtext, "deflategate")
+
+    def test_normalize_spaced(self):
+        intext = "Deflate Gate"
+        outtext = schindex.normalize_topic(intext)
+        self.assertEqual(outtext, "deflategate")
+
+    def test_normalize_punctuation(self):
+        intext = "No Man's Sky"
+        outtext = schindex.normalize_topic(intext)
+        self.assertEqual(outtext, "nomanssky")
+
+    def test_normalize_only_punctuation(self):
+        intext = "#!!!"
+        outtext = schindex.normalize_topic(intext)
+        self.assertEqual(outtext, "#!!!")
+
+
+class TestTopicIndex(unittest.TestCase):
+
+    def test_contains(self):
+        index = schindex.TopicIndex(["#DeflateGate"])
+        self.assertIn("#DeflateGate", index)
+        self.assertIn("Deflate Gate", index)
+        self.assertIn("deflategate", index)
+        self.assertNotIn("#DeflateGates", index)
+
+    def test_append(self):
+        index = schindex.TopicIndex()
+        index.append("Adrian Chiles")
+        self.assertIn("#AdrianChiles", index)
+        self.assertEqual(list(index), ["Adrian Chiles"])
+        self.assertEqual(len(index), 1)
+
+    def test_near_duplicates(self):
+        index = schindex.TopicIndex(
+            ["#DeflateGate", "Adrian Chiles"], threshold=0.7)
+        self.assertIn("#DeflateGates", index)
+        self.assertNotIn("#BigBossBash", index)
+        self.assertEqual(
+            index.near_duplicates("Deflate Gates"), ["deflategate"])
+
+    def test_lsh_rows(self):
+        for threshold in (0.75, 0.8, 0.9):
+            rows = schindex.lsh_rows(threshold)
+            bands = schindex.NUM_HASHES // rows
+            recall = 1 - (1 - threshold ** rows) ** bands
+            self.assertGreaterEqual(recall, schindex.RECALL)
+        self.assertLess(schindex.lsh_rows(0.75), schindex.lsh_rows(0.9))
+        self.assertEqual(schindex.lsh_rows(0.3), schindex.MIN_ROWS)
+
+    def test_threshold(self):
+        for threshold in (0, -0.5, 1.5):
+            with self.assertRaises(ValueError):
+                schindex.TopicIndex(threshold=threshold)
+        self.assertEqual(schindex.similarity_threshold("1"), 1.0)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            schindex.similarity_threshold("80")
+
+    def test_lookup_time(self):
+        # Lookups mustn't slow down much as the index grows, even at a low
+        # threshold with few rows per band
+        index = schindex.TopicIndex(schdiff.corpus(20000), threshold=0.5)
+        queries = list(schdiff.corpus(1000, seed=1))
+        started = time.time()
+        for topic in queries:
+            topic in index
+        per_lookup = (time.time() - started) / len(queries)
+        self.assertLess(per_lookup, 0.001)
+
+    def test_near_duplicates_off(self):
+        index = schindex.TopicIndex(["#DeflateGate"])
+        self.assertEqual(index.near_duplicates("#DeflateGates"), [])
+
+
+class TestSignatures(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "schbot_signatures.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_same_in_every_process(self):
+        code = ("import schindex; "
+                "print(schindex.minhash(schindex.shingles('deflategate')))")
+        output = subprocess.check_output([sys.executable, "-c", code])
+        expected = schindex.minhash(schindex.shingles("deflategate"))
+        self.assertEqual(output.decode('ascii').strip(), str(expected))
+
+    def test_signature_file(self):
+        signatures = schindex.SignatureFile(self.filename)
+        index = schindex.TopicIndex(
+            ["#DeflateGate", "Adrian Chiles"], 0.7, signatures)
+        signatures.save()
+        signatures.close()
+        self.assertEqual(sorted(signatures), ["adrianchiles", "deflategate"])
+
+        signatures = schindex.SignatureFile(self.filename)
+        self.assertEqual(signatures, index.signatures)
+        index = schindex.TopicIndex(["#DeflateGate"], 0.7, signatures)
+        signatures.close()
+        self.assertIn("#DeflateGates", index)
+        self.assertNotIn("#BigBossBash", index)
+
+    def test_signature_version(self):
+        signatures = schindex.SignatureFile(self.filename)
+        schindex.TopicIndex(["#DeflateGate"], 0.7, signatures)
+        signatures.save()
+        signatures.connection.execute("PRAGMA user_version = 0")
+        signatures.close()
+
+        signatures = schindex.SignatureFile(self.filename)
+        signatures.close()
+        self.assertEqual(signatures, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# End of file
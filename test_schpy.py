@@ -269,6 +269,38 @@ class TestSchpy(unittest.TestCase):
         self.assertEqual(outtext, "schmotes")
 
 
+class TestVariants(unittest.TestCase):
+
+    def test_prefix(self):
+        intext = "Led Zeppelin"
+        outtext = schpy.schpy(intext, "shm")
+        self.assertEqual(outtext, "Led Shmeppelin")
+
+    def test_variants(self):
+        intext = "Adrian Chiles"
+        outtext = schpy.schpy_variants(intext, ["schm", "shm", "shp", "sm"])
+        self.assertEqual(outtext, ["Adrian Schmiles", "Adrian Shmiles",
+                                   "Adrian Shpiles", "Adrian Smiles"])
+
+    def test_variants_caps(self):
+        intext = "HOTEL"
+        outtext = schpy.schpy_variants(intext, ["schm", "shp"])
+        self.assertEqual(outtext, ["SCHMOTEL", "SHPOTEL"])
+
+    def test_variants_same_prefix(self):
+        """
+        Like schmuck schnuck, don't give back the word unchanged.
+        """
+        intext = "shmear"
+        outtext = schpy.schpy_variants(intext, ["schm", "shm", "shp"])
+        self.assertEqual(outtext, ["schmear", "shnear", "shpear"])
+
+    def test_variants_nothing(self):
+        intext = ""
+        outtext = schpy.schpy_variants(intext, ["schm", "shm"])
+        self.assertEqual(outtext, ["", ""])
+
+
 class TestSchmopic(unittest.TestCase):
 
     def test_topic_schmopic_1(self):
@@ -346,6 +378,21 @@ class TestSchmopic(unittest.TestCase):
         outtext = schpy.topic_schmopic(intext)
         self.assertEqual(outtext, "#SnotSchmotes")
 
+    def test_topic_schmopic_prefix(self):
+        intext = "#DeflateGate"
+        outtext = schpy.topic_schmopic(intext, "shm")
+        self.assertEqual(outtext, "#DeflateShmate")
+
+    def test_topic_schmopic_variants(self):
+        intext = "#BigBossBash"
+        outtext = schpy.topic_schmopic_variants(intext, ["schm", "shp"])
+        self.assertEqual(outtext, ["#BigBossSchmash", "#BigBossShpash"])
+
+    def test_topic_schmopic_variants_number(self):
+        intext = "Uncharted 4"
+        outtext = schpy.topic_schmopic_variants(intext, ["schm", "shp"])
+        self.assertEqual(outtext, [False, False])
+
 #     def test_topic_schmopic_11(self):
 #         intext = "#MCFCvEFC"
 #         outtext = schpy.topic_schmopic(intext)
@@ -359,7 +406,6 @@ class TestSchmopic(unittest.TestCase):
 # Smashmont, not *shmashmont).
 
 # TODO caps
-# TODO schm vs shm option
 
 if __name__ == '__main__':
     unittest.main()
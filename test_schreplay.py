@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+Unit tests for schreplay.py
+"""
+from __future__ import print_function, unicode_literals
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import schbot
+import schreplay
+
+
+def response(*names):
+    return json.dumps([{"trends": [
+        {"name": name, "promoted_content": None, "tweet_volume": None}
+        for name in names]}])
+
+
+class TestVirtualClock(unittest.TestCase):
+
+    def test_advance(self):
+        clock = schreplay.VirtualClock(1000.0)
+        clock.advance_to(1900.0)
+        self.assertEqual(clock.now, 1900.0)
+        self.assertEqual(clock.elapsed(), 900.0)
+
+    def test_never_backwards(self):
+        clock = schreplay.VirtualClock(1000.0)
+        clock.advance_to(1900.0)
+        clock.advance_to(1500.0)
+        self.assertEqual(clock.now, 1900.0)
+        self.assertEqual(clock.elapsed(), 900.0)
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "trends.jsonl")
+        records = [
+            # Posts #DeflateGate
+            (0, "UK", response("#DeflateGate", "Adrian Chiles")),
+            # #DeflateGate is a duplicate, posts Adrian Chiles
+            (1800, "US", response("Deflate Gate", "Adrian Chiles")),
+            # Both duplicates, nothing to post
+            (3600, "UK", response("deflategate", "#AdrianChiles")),
+            # Ends in a number, nothing to post
+            (7200, "UK", response("Uncharted 4")),
+        ]
+        with open(self.filename, 'w') as f:
+            for when, location, raw in records:
+                f.write(json.dumps({
+                    'time': when, 'location': location, 'raw': raw}) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_load_records(self):
+        records = list(schreplay.load_records(self.filename))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[1]['location'], "US")
+
+    def test_replay(self):
+        report = schreplay.replay(self.filename)
+        self.assertEqual(report['cycles'], 4)
+        self.assertEqual(report['posts'], 2)
+        self.assertEqual(report['trends_seen'], 7)
+        self.assertEqual(report['duplicates'], 3)
+        self.assertEqual(report['history_size'], 2)
+        self.assertEqual(report['virtual_hours'], 2.0)
+        self.assertEqual(report['posts_per_hour'], 1.0)
+
+    def test_replay_with_history(self):
+        report = schreplay.replay(self.filename, history=["#AdrianChiles"])
+        self.assertEqual(report['posts'], 1)
+        self.assertEqual(report['duplicates'], 5)
+
+    def test_restores_schbot(self):
+        twitter = schbot.TWITTER
+        schreplay.replay(self.filename)
+        self.assertIs(schbot.TWITTER, twitter)
+        self.assertIsNone(schbot.TWITTER_RAW)
+        self.assertFalse(hasattr(schbot, 'args'))
+        self.assertFalse(hasattr(schbot, 'saved_trends'))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# End of file